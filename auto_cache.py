@@ -0,0 +1,51 @@
+import ast        # Importing AST so parsed trees can be cached alongside source
+import functools  # Importing functools for lru_cache memoization
+import os         # Importing OS to stat files for their modification time
+from pathlib import Path
+
+
+@functools.lru_cache(maxsize=1024)
+def _load(path_str: str, mtime_ns: int) -> str:
+    """
+    Reads a file, memoized on (path, mtime).
+
+    The mtime is part of the key, so editing a file naturally invalidates its
+    cached entry on the next lookup.
+    """
+    return Path(path_str).read_text(encoding="utf-8")
+
+
+@functools.lru_cache(maxsize=1024)
+def _parse(path_str: str, mtime_ns: int) -> ast.Module:
+    """
+    Parses a file into an AST, memoized on (path, mtime).
+    """
+    return ast.parse(_load(path_str, mtime_ns))
+
+
+def load_source(path) -> str:
+    """
+    Returns the text of a file, cached across passes until the file changes.
+
+    Parameters:
+    - path: The file to read (str or Path).
+
+    Returns:
+    str: The file's contents.
+    """
+    path_str = str(path)
+    return _load(path_str, os.stat(path_str).st_mtime_ns)
+
+
+def load_parsed(path) -> ast.Module:
+    """
+    Returns the parsed AST of a file, cached across passes until the file changes.
+
+    Parameters:
+    - path: The file to parse (str or Path).
+
+    Returns:
+    ast.Module: The parsed syntax tree.
+    """
+    path_str = str(path)
+    return _parse(path_str, os.stat(path_str).st_mtime_ns)
@@ -1,5 +1,57 @@
-import ollama
+import ast
+import io
+import tokenize
 from pathlib import Path
+from auto_cache import load_source
+from llm_cache import cached_chat_to_file
+
+# Coarse verbosity buckets for comment styles; styles in the same bucket are
+# close enough that re-commenting the file isn't worth an LLM round-trip
+STYLE_RANK = {"minimal": 0, "light": 0, "moderate": 1, "verbose": 2, "extensive": 2}
+
+# Comment+docstring density thresholds separating the verbosity buckets
+STYLE_THRESHOLDS = ((0.05, "minimal"), (0.25, "moderate"))
+
+
+def classify_commenting_style(source: str) -> str:
+    """
+    Classifies how verbosely a piece of Python code is commented, without an LLM.
+
+    The ratio of comment and docstring characters to the rest of the code is a
+    direct measure of the verbosity the old LLM prompt was asked to eyeball.
+
+    Parameters:
+    - source (str): The Python source code to classify.
+
+    Returns:
+    str: "minimal", "moderate", or "verbose"; "unknown" if the code can't be tokenized.
+    """
+    try:
+        # Count characters inside # comments
+        comment_chars = sum(
+            len(tok.string)
+            for tok in tokenize.generate_tokens(io.StringIO(source).readline)
+            if tok.type == tokenize.COMMENT
+        )
+        # Count characters inside module, class, and function docstrings
+        docstring_chars = 0
+        tree = ast.parse(source)
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                doc = ast.get_docstring(node)
+                if doc:
+                    docstring_chars += len(doc)
+    except (SyntaxError, tokenize.TokenError):
+        # Unparseable code ranks -1 in STYLE_RANK and so always gets re-commented
+        return "unknown"
+
+    # Compare against the non-whitespace code characters that remain
+    code_chars = max(sum(1 for ch in source if not ch.isspace()) - comment_chars - docstring_chars, 1)
+    ratio = (comment_chars + docstring_chars) / code_chars
+    for threshold, style in STYLE_THRESHOLDS:
+        if ratio < threshold:
+            return style
+    return "verbose"
 
 def get_auto_docu_path(src: Path, new_branch_root: Path):
     """
@@ -33,30 +85,27 @@ def clean_markdown_code_fence(file_path: Path) -> None:
     Returns:
     None
     """
-    # Read the entire file into memory as a list of lines
-    lines = file_path.read_text(encoding="utf-8").splitlines()
-    
-    if lines and lines[0].strip().lower() == "```python":
-        """
-        If the first line starts with "'''python", remove it from the beginning of the list.
-        
-        We use `strip` to remove leading/trailing whitespace before comparing, and convert to lowercase for case-insensitive comparison.
-        """
-        lines = lines[1:]
+    # Only the first and last lines matter, so inspect them directly on the raw
+    # bytes instead of splitting the whole file into a line list and re-joining
+    data = file_path.read_bytes()
 
-    if lines and lines[-1].strip() == "```":
-        """
-        If the last line is just "'''", remove it from the end of the list.
-        
-        Again, we use `strip` to remove leading/trailing whitespace before comparing.
-        """
-        lines = lines[:-1]
+    first_nl = data.find(b"\n")
+    first_line = data if first_nl == -1 else data[:first_nl]
+    if first_line.strip().lower() == b"```python":
+        # Drop the opening fence line (case-insensitive, whitespace tolerated)
+        data = b"" if first_nl == -1 else data[first_nl + 1:]
 
-    # Write the cleaned-up lines back to the file
-    file_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    body = data.rstrip()
+    last_nl = body.rfind(b"\n")
+    if body[last_nl + 1:].strip() == b"```":
+        # Drop the closing fence line
+        body = body[:last_nl] if last_nl != -1 else b""
 
+    # Write the cleaned-up content back with a single trailing newline
+    file_path.write_bytes(body.rstrip() + b"\n")
 
-def auto_comment(file_path: Path, auto_docu_root: Path, model: str = "llama3.1:8b", commenting_style: str = "moderate"):
+
+def auto_comment(file_path: Path, auto_docu_root: Path, model: str = "llama3.1:8b-instruct-q4_K_M", commenting_style: str = "moderate"):
     """
     Adds inline comments to a Python file using LLM.
     
@@ -64,148 +113,64 @@ def auto_comment(file_path: Path, auto_docu_root: Path, model: str = "llama3.1:8
     
     Parameters:
     - file_path (Path): The path to the file to comment.
-    - model (str, optional): The model to use for commenting. Defaults to "llama3.1:8b".
+    - model (str, optional): The model to use for commenting. Defaults to "llama3.1:8b-instruct-q4_K_M".
     - commenting_style (str, optional): The style of commenting to apply. Defaults to "moderate".
 
     Returns:
     Path: The path to the commented version of the file.
     """
-    with open(file_path, "r", encoding="utf-8") as f:
-        # Read the entire file into memory
-        original_code = f.read()
-
-    #determine existing commenting style
-    prompt = f""" You are a Python commenting assistant. Read the following code and determine what commenting style is applied.
-    Just reply a single phrase between 1 and 3 words long (ex. extensive, light) that describes the verbosity of commenting that you find in this file, no explanations or details.    
-    ```python
-    {original_code}
-    """
-
-    try:
-        """
-        Send the prompt to the LLM and get back the commented code.
-
-        We use a `try`-`except` block to catch any errors that might occur during this process.
-        """
-        response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])
-        # Get the commented code from the LLM's response
-        existing_commenting = (response["message"]["content"]).replace('commenting','')
-        print(existing_commenting)
-    except Exception as e:
-        """
-        If an error occurs during reading code, print the error and do not add comments to code.
-        
-        This ensures that the function doesn't crash if something goes wrong, but still allows the user to see what happened.
-        """
-        print(f"[Error reading code {file_path.name}]: {e}")
-        existing_commenting='unknown'
+    # Read the entire file into memory (cached across passes)
+    original_code = load_source(file_path)
 
-    #deterine if existing 
-    prompt = f"""Answer how similar or different the phrase {existing_commenting} is from the phrase {commenting_style} in terms of code commenting verbosity.
-    Simply reply with very different, different, similar, or very similar. Just give your answer. No explanation is needed.
-    """
-        
-    try:
-        """
-        Send the prompt to the LLM and get back the commented code.
+    #determine existing commenting style from the comment/docstring density — no LLM needed
+    existing_commenting = classify_commenting_style(original_code)
+    print(existing_commenting)
 
-        We use a `try`-`except` block to catch any errors that might occur during this process.
-        """
-        response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])
-        # Get the commented code from the LLM's response
-        commenting_diff_scale = (response["message"]["content"]).lower()
-        needs_commenting=True if 'different' in commenting_diff_scale else False
-        print("commenting_diff_scale: " + commenting_diff_scale)
-        print("needs_commenting: "+ str(needs_commenting))
-    except Exception as e:
-        """
-        If an error occurs during reading code, print the error and do not add comments to code.
-        
-        This ensures that the function doesn't crash if something goes wrong, but still allows the user to see what happened.
-        """
-        print(f"[Error reading code {file_path.name}]: {e}")
-        needs_commenting=False
+    #determine if the existing style is far enough from the requested one to re-comment.
+    #The style vocabulary is small and fixed, so a local rank lookup replaces what used
+    #to be a second LLM round-trip. An unrecognized existing style ranks -1 and so
+    #always triggers re-commenting.
+    needs_commenting = STYLE_RANK.get(existing_commenting.strip().lower(), -1) != STYLE_RANK.get(commenting_style.strip().lower(), -1)
+    print("needs_commenting: "+ str(needs_commenting))
 
     if needs_commenting:
-        # Construct a prompt for the LLM based on the commenting style and model
-        prompt = f""" You are a Python commenting assistant. 
-        Read the following code and return the same code, but remove the existing comments
-        Return ONLY the modified code with comments removed. Do not summarize or explain. 
+        # One fused prompt: stripping the old comments and adding the new ones in a
+        # single pass halves the LLM round-trips and skips the intermediate file write
+        prompt = f""" You are a Python commenting assistant.
+        Read the following code and return the same code, but with {commenting_style} inline comments, replacing any pre-existing comments.
+        Return ONLY the modified code with comments. Do not summarize or explain.
         ```python
         {original_code}
         """
         try:
             """
             Send the prompt to the LLM and get back the commented code.
-            
+
             We use a `try`-`except` block to catch any errors that might occur during this process.
             """
-            response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])
-            # Get the commented code from the LLM's response
-            un_commented_code = response["message"]["content"]
-
             # Create a new path for the commented version of the file
-            
+
             new_path = get_auto_docu_path(file_path,auto_docu_root)
-            
-            with open(new_path, "w", encoding="utf-8") as f:
-                # Write the commented code to the new file
-                f.write(un_commented_code)
-            
-            clean_markdown_code_fence(new_path)  # Remove leading/trailing Markdown code fences
-            print(f"Original comments removed from {new_path.name}")
-        except Exception as e:
-            """
-            If an error occurs during commenting, print the error and return None.
-            
-            This ensures that the function doesn't crash if something goes wrong, but still allows the user to see what happened.
-            """
-            print(f"[Error commenting {file_path.name}]: {e}")
 
-        with open(new_path, "r", encoding="utf-8") as f:
-                # Write the commented code to the new file
-                un_commented_code=f.read()
-        # Construct a prompt for the LLM based on the commenting style and model
-        prompt = f""" You are a Python commenting assistant. 
-        Read the following code and return the same code, but with {commenting_style} inline comments.
-        Return ONLY the modified code with comments. Do not summarize or explain. 
-        ```python
-        {un_commented_code}
-        """
-        try:
-            """
-            Send the prompt to the LLM and get back the commented code.
-            
-            We use a `try`-`except` block to catch any errors that might occur during this process.
-            """
-            response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])
-            # Get the commented code from the LLM's response
-            commented_code = response["message"]["content"]
+            # Stream the LLM's reply straight into the new file as it is generated
+            # (served from the disk cache on re-runs)
+            cached_chat_to_file(model, [{"role": "user", "content": prompt}], new_path)
 
-            # Create a new path for the commented version of the file
-            
-            new_path = get_auto_docu_path(file_path,auto_docu_root)
-            
-            with open(new_path, "w", encoding="utf-8") as f:
-                # Write the commented code to the new file
-                f.write(commented_code)
-            
             clean_markdown_code_fence(new_path)  # Remove leading/trailing Markdown code fences
             print(f"New comments added to {new_path.name}")
 
         except Exception as e:
             """
             If an error occurs during commenting, print the error and return None.
-            
+
             This ensures that the function doesn't crash if something goes wrong, but still allows the user to see what happened.
             """
             print(f"[Error commenting {file_path.name}]: {e}")
-        
+
     else:
-        print(f"No Comments style change needed for {new_path.name}")
         new_path = get_auto_docu_path(file_path,auto_docu_root)
-        with open(new_path, "w", encoding="utf-8") as f:
-            # Write the commented code to the new file
-            f.write(original_code)
+        print(f"No Comments style change needed for {new_path.name}")
+        # Copy the original code through unchanged
+        new_path.write_text(original_code, encoding="utf-8")
             
 
@@ -1,8 +1,37 @@
-import ollama  # Importing Ollama for generating docstrings using LLaMA model
+import asyncio  # Importing asyncio to overlap the per-function LLM calls
 import ast   # Importing Abstract Syntax Trees (AST) module for parsing Python code
+import json  # Importing JSON to parse the batched docstring response
 import os    # Importing OS module for file operations
+import textwrap  # Importing textwrap to indent docstring blocks in one call
+from pathlib import Path  # Importing Path for buffered text file I/O
 from typing import List, Tuple  # Importing type hints for function arguments and return types
+from ollama import AsyncClient  # Importing Ollama's async client so requests can run concurrently
+from auto_cache import load_parsed, load_source
 from auto_comment_functions import get_auto_docu_path
+from llm_cache import cached_chat_async
+
+def _iter_functions(node):
+    """
+    Yields every function definition in the tree without visiting expression nodes.
+
+    Defs can appear inside class bodies and any compound statement (if/try/
+    with/for/...), so every statement-level node is descended into. Only
+    expression subtrees — which can never contain a def and make up the vast
+    majority of the AST (Name, Load, Constant, ...) — are skipped.
+
+    Args:
+        node: An AST node to scan (typically the parsed Module).
+
+    Yields:
+        ast.FunctionDef | ast.AsyncFunctionDef: Each function definition found.
+    """
+    for child in ast.iter_child_nodes(node):
+        if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            yield child
+            yield from _iter_functions(child)  # Nested functions too
+        elif not isinstance(child, ast.expr):
+            # Class bodies, compound statements, except handlers, match cases, ...
+            yield from _iter_functions(child)
 
 def extract_functions_missing_docstrings(file_path: str) -> Tuple[str, List[Tuple[ast.FunctionDef, str]]]:
     """
@@ -15,42 +44,108 @@ def extract_functions_missing_docstrings(file_path: str) -> Tuple[str, List[Tupl
         Tuple[str, List[Tuple[ast.FunctionDef, str]]]: A tuple containing the full source code and a list of tuples,
             where each tuple contains an AST FunctionDef node and the source code of the function.
     """
-    with open(file_path, "r", encoding="utf-8") as f:  # Open file in read mode with UTF-8 encoding
-        source = f.read()  # Read entire file into a string
+    source = load_source(file_path)  # Read entire file into a string (cached across passes)
 
-    tree = ast.parse(source)  # Parse Python code into an Abstract Syntax Tree (AST)
-    lines = source.splitlines()  # Split source code into individual lines
+    tree = load_parsed(file_path)  # Parse Python code into an AST (cached across passes)
 
     missing = []  # Initialize list to store functions with missing docstrings
-    for node in ast.walk(tree):  # Iterate over all nodes in the AST
-        if isinstance(node, ast.FunctionDef) and ast.get_docstring(node) is None:  # Check if node is a FunctionDef with no docstring
-            func_lines = lines[node.lineno - 1 : node.end_lineno]  # Get source code of function as a list of lines
-            func_src = "\n".join(func_lines)  # Join source code lines into a single string
-            missing.append((node, func_src))  # Append tuple containing FunctionDef node and source code to list
+    for node in _iter_functions(tree):  # Visits only definition nodes, not the whole AST
+        if ast.get_docstring(node) is None:  # Check if function has no docstring
+            # get_source_segment slices the source once per function instead of
+            # keeping a full splitlines() copy of the file around
+            missing.append((node, ast.get_source_segment(source, node)))
 
     return source, missing  # Return full source code and list of functions with missing docstrings
 
-def suggest_docstring_with_ollama(function_code: str, model: str = "llama3.1:8b") -> str:
+async def suggest_docstring_with_ollama(function_code: str, model: str = "llama3.1:8b-instruct-q4_K_M", client: AsyncClient = None) -> str:
     """
     Uses Ollama to generate a docstring for a given function.
-    
+
     Args:
         function_code (str): Source code of the function as a string
-        model (str, optional): LLaMA model version (default: "llama3.1:8b")
+        model (str, optional): LLaMA model version (default: "llama3.1:8b-instruct-q4_K_M")
+        client (AsyncClient, optional): Async Ollama client to reuse. A new one is created if not given.
 
     Returns:
         str: Generated docstring using Ollama's LLaMA model
     """
-    prompt = f"""You are a helpful Python documentation assistant. Read the following Python 
-    function and write a clear, concise google style docstring in triple quotes. Only output 
+    prompt = f"""You are a helpful Python documentation assistant. Read the following Python
+    function and write a clear, concise google style docstring in triple quotes. Only output
     the docstring starting your reply with triple quotes.
     ```python
     {function_code}
     ```"""
-    # Send prompt to Ollama model and get response
-    response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])  
-    # Return generated docstring from Ollama's response
-    return response["message"]["content"]  
+    if client is None:
+        # Create a client on the fly when called standalone
+        client = AsyncClient()
+    # Send prompt to Ollama model and await the response (served from the disk cache on re-runs)
+    return await cached_chat_async(model, [{"role": "user", "content": prompt}], client)
+
+# Functions packed per prompt; keeps each batched prompt within a few thousand tokens
+BATCH_SIZE = 8
+
+async def suggest_docstrings_batch_with_ollama(function_codes: List[str], model: str = "llama3.1:8b-instruct-q4_K_M", client: AsyncClient = None) -> list:
+    """
+    Uses a single Ollama call to generate docstrings for several functions at once.
+
+    Args:
+        function_codes (List[str]): Source code of each function as a string
+        model (str, optional): LLaMA model version (default: "llama3.1:8b-instruct-q4_K_M")
+        client (AsyncClient, optional): Async Ollama client to reuse. A new one is created if not given.
+
+    Returns:
+        list: One generated docstring (or the Exception raised) per function, in input order
+    """
+    # Tag each function so the model can address them individually in its reply
+    tagged = "\n".join(f"<FN id={i}>\n{code}\n</FN>" for i, code in enumerate(function_codes))
+    prompt = f"""You are a helpful Python documentation assistant. For EACH tagged Python
+    function below, write a clear, concise google style docstring in triple quotes.
+    Reply with ONLY a JSON object mapping each id to its docstring, like
+    {{"0": "\\"\\"\\"...\\"\\"\\"", "1": "\\"\\"\\"...\\"\\"\\""}}. No explanations.
+    {tagged}"""
+    if client is None:
+        # Create a client on the fly when called standalone
+        client = AsyncClient()
+    try:
+        # Served from the disk cache on re-runs over unchanged source
+        content = (await cached_chat_async(model, [{"role": "user", "content": prompt}], client)).strip()
+        if content.startswith("```"):
+            # Strip a Markdown fence the model sometimes wraps the JSON in
+            content = content.strip("`").removeprefix("json").strip()
+        parsed = json.loads(content)
+        # Pull out each id in order; a missing id or a non-string value becomes
+        # an error for that function only
+        return [parsed[str(i)] if isinstance(parsed.get(str(i)), str) else KeyError(f"no usable docstring returned for id {i}")
+                for i in range(len(function_codes))]
+    except Exception as e:
+        # The whole batch failed (HTTP error or unparseable reply); report it for every function
+        return [e] * len(function_codes)
+
+async def _gather_docstrings(missing_funcs: List[Tuple[ast.FunctionDef, str]], model: str) -> list:
+    """
+    Generates docstrings for all functions using batched prompts fired concurrently.
+
+    Args:
+        missing_funcs (List[Tuple[ast.FunctionDef, str]]): Functions missing docstrings and their source code
+        model (str): LLaMA model version to use
+
+    Returns:
+        list: One generated docstring (or the Exception raised) per function, in input order
+    """
+    client = AsyncClient()  # One shared client so all requests reuse the same connection pool
+    # Throttle in-flight requests so the Ollama server doesn't just serialize them anyway
+    semaphore = asyncio.Semaphore(int(os.getenv("OLLAMA_NUM_PARALLEL", "8")))
+
+    # Split into batches so each prompt stays small while batches still overlap
+    chunks = [missing_funcs[i : i + BATCH_SIZE] for i in range(0, len(missing_funcs), BATCH_SIZE)]
+
+    async def one_batch(chunk):
+        async with semaphore:
+            return await suggest_docstrings_batch_with_ollama([func_src for _, func_src in chunk], model=model, client=client)
+
+    batch_results = await asyncio.gather(*[one_batch(chunk) for chunk in chunks])
+    # Flatten the per-batch lists back into one list aligned with missing_funcs
+    return [doc for batch in batch_results for doc in batch]
 
 def insert_docstrings(source: str, func_nodes: List[Tuple[ast.FunctionDef, str]], docstrings: List[str]) -> str:
     """
@@ -66,22 +161,33 @@ def insert_docstrings(source: str, func_nodes: List[Tuple[ast.FunctionDef, str]]
     """
     lines = source.splitlines()  # Split source code into individual lines
 
-    # Reverse so inserting docstrings doesn't affect line numbers of later functions
-    for (node, _), doc in reversed(list(zip(func_nodes, docstrings))):
-        insert_line = node.body[0].lineno  # Get line number where docstring should be inserted
-        indent = " " * (node.col_offset + 4)  # Calculate indentation level for docstring lines
-        doc_lines = [indent + line for line in doc.strip().splitlines()]  # Split docstring into individual lines and add indentation
-        lines.insert(insert_line - 1, "\n".join(doc_lines))  # Insert docstring lines before corresponding function
-
-    return "\n".join(lines)  # Join modified source code back into a single string
-
-def generate_docstring_suggestions(file_path: str, auto_docu_root: str, model: str = "llama3.1:8b"):
+    # Build (position, block) edits up front; textwrap.indent formats each docstring
+    # in one call instead of re-joining indented lines by hand
+    edits = sorted(
+        (node.body[0].lineno - 1, textwrap.indent(doc.strip(), " " * (node.col_offset + 4)))
+        for (node, _), doc in zip(func_nodes, docstrings)
+    )
+
+    # Single merge pass: list.insert shifts the whole tail each time, so splicing
+    # edits while walking the lines once is O(N+F) instead of O(N*F)
+    merged = []
+    edit_idx = 0
+    for lineno, line in enumerate(lines):
+        while edit_idx < len(edits) and edits[edit_idx][0] == lineno:
+            merged.append(edits[edit_idx][1])
+            edit_idx += 1
+        merged.append(line)
+    merged.extend(block for _, block in edits[edit_idx:])  # Edits past the last line
+
+    return "\n".join(merged)  # Join modified source code back into a single string
+
+def generate_docstring_suggestions(file_path: str, auto_docu_root: str, model: str = "llama3.1:8b-instruct-q4_K_M"):
     """
     Generates suggested docstring for functions with missing docstrings in a given Python file.
     
     Args:
         file_path (str): Path to the Python file to analyze
-        model (str, optional): LLaMA model version (default: "llama3.1:8b")
+        model (str, optional): LLaMA model version (default: "llama3.1:8b-instruct-q4_K_M")
 
     Returns:
         None
@@ -92,24 +198,25 @@ def generate_docstring_suggestions(file_path: str, auto_docu_root: str, model: s
     source, missing_funcs = extract_functions_missing_docstrings(file_path)  # Extract functions with missing docstrings
     docstrings = []  # Initialize list to store generated docstrings for functions
 
-    for node, func_src in missing_funcs:
+    # Run all docstring requests concurrently; wall time is roughly one call instead of N
+    results = asyncio.run(_gather_docstrings(missing_funcs, model)) if missing_funcs else []
+
+    for (node, func_src), result in zip(missing_funcs, results):
         print("=" * 80)  # Print separator line
         print(f"Function: {node.name} (Line {node.lineno})")  # Print function name and line number
         print("- Suggested Docstring -")  # Print header for suggested docstring
-        try:
-            doc = suggest_docstring_with_ollama(func_src, model=model)  # Generate docstring using Ollama's LLaMA model
-            print(doc)  # Print generated docstring
-            docstrings.append(doc)  # Append generated docstring to list
-        except Exception as e:  # Catch any exceptions during docstring generation
-            print(f"[Error generating docstring] {e}")  # Print error message
+        if isinstance(result, Exception):  # gather returned the exception for this function
+            print(f"[Error generating docstring] {result}")  # Print error message
             docstrings.append('"""TODO: Add docstring"""')  # Append default docstring with TODO comment
+        else:
+            print(result)  # Print generated docstring
+            docstrings.append(result)  # Append generated docstring to list
         print()  # Print newline for next function
 
     if missing_funcs:
 
-        new_source = insert_docstrings(source, missing_funcs, docstrings)  # Insert generated docstrings into source code            
-        with open(file_path, "w", encoding="utf-8") as f:  # Open new file in write mode with UTF-8 encoding
-            f.write(new_source)  # Write modified source code to new file
+        new_source = insert_docstrings(source, missing_funcs, docstrings)  # Insert generated docstrings into source code
+        Path(file_path).write_text(new_source, encoding="utf-8")  # Write modified source code back to the file
         print(f"\n✅ Docstrings added to: {file_path}")  # Print success message
       
     else:
@@ -1,11 +1,14 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List, Optional
 from auto_comment_functions import auto_comment
 from auto_docstring_functions import generate_docstring_suggestions
 from auto_summary import find_all_python_files, describe_directory_structure, summarize_directory, generate_readme
+from llm_cache import warm_up
 
 
-def orchestrate_all(directory: str, exclude_dirs: Optional[List[str]] = None, commenting_style: str = 'moderate', model: str = "llama3.1:8b"):
+def orchestrate_all(directory: str, exclude_dirs: Optional[List[str]] = None, commenting_style: str = 'moderate', model: str = "llama3.1:8b-instruct-q4_K_M"):
     """
     Orchestrates the commenting and summarization of a directory.
     
@@ -13,7 +16,7 @@ def orchestrate_all(directory: str, exclude_dirs: Optional[List[str]] = None, co
     - directory (str): The path to the root directory to comment and summarize.
     - exclude_dirs (Optional[List[str]], optional): A list of directories to exclude from commenting and summarization. Defaults to None.
     - commenting_style (str, optional): The style of commenting to apply. Defaults to 'moderate'.
-    - model (str, optional): The model to use for commenting and summarizing. Defaults to "llama3.1:8b".
+    - model (str, optional): The model to use for commenting and summarizing. Defaults to "llama3.1:8b-instruct-q4_K_M".
 
     Returns:
     None
@@ -22,31 +25,51 @@ def orchestrate_all(directory: str, exclude_dirs: Optional[List[str]] = None, co
 
     auto_docu_path=Path(directory+'/auto_docu_output')
     print(f"Scanning directory: {directory}")
+
+    # Preload the model so the first worker doesn't pay the model-load latency
+    warm_up(model)
     
     #default directories to exclude
     exclude_dirs=exclude_dirs+['venv','__pycache__']
 
     # Find all Python files in the directory and its subdirectories
     all_files = find_all_python_files(directory, exclude_dirs)
-    
+
+    # Largest files first: LLM latency scales with file size, so starting the big
+    # ones early keeps workers from idling behind a huge file submitted last
+    all_files.sort(key=lambda p: p.stat().st_size, reverse=True)
+
     for f in all_files:
         print(f.name)
         
     print("\nAdding {"+commenting_style+"} comments...")
-    
-    # Comment each file using auto_comment
-    for file_path in all_files:
+
+    # Each file is independent and spends its time waiting on Ollama, so fan the
+    # work out over a thread pool instead of processing files one at a time
+    max_workers = int(os.getenv("AUTODOCU_WORKERS", "8"))
+
+    def comment_one(file_path):
         print(str(file_path))
         auto_comment(file_path, auto_docu_path, model=model, commenting_style=commenting_style)
-        
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # list() drains the iterator so any worker exception surfaces here
+        list(executor.map(comment_one, all_files))
+
     print("\nGenerating docstrings...")
-    
+
     # Generate docstrings for each commented file using generate_docstring_suggestions
     all_files = find_all_python_files(str(auto_docu_path))
 
-    for file_path in all_files:
+    # Same longest-first ordering for the docstring pass
+    all_files.sort(key=lambda p: p.stat().st_size, reverse=True)
+
+    def docstring_one(file_path):
         print(str(file_path))
-        generate_docstring_suggestions(str(file_path), str(auto_docu_path),  model=model)
+        generate_docstring_suggestions(str(file_path), str(auto_docu_path), model=model)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(docstring_one, all_files))
 
     print("\n Describing directory...")
     describe_directory_structure(directory, auto_docu_path, exclude_dirs)
@@ -63,7 +86,15 @@ def orchestrate_all(directory: str, exclude_dirs: Optional[List[str]] = None, co
 if __name__ == "__main__":
     import argparse
 
-    parser = argparse.ArgumentParser(description="Auto-document a Python project directory using Ollama.")
+    parser = argparse.ArgumentParser(
+        description="Auto-document a Python project directory using Ollama.",
+        epilog=(
+            "Environment variables: AUTODOCU_WORKERS sets how many files are processed "
+            "concurrently (default 8). For real parallelism the Ollama server must also "
+            "allow it: set OLLAMA_NUM_PARALLEL to the number of simultaneous requests "
+            "per model and OLLAMA_MAX_LOADED_MODELS if you run more than one model."
+        ),
+    )
     parser.add_argument("directory", type=str, help="Path to the directory you want to process.")
     parser.add_argument(
         "--exclude_dirs", nargs="*", default=["__pycache__", "venv", ".git"],
@@ -74,8 +105,8 @@ if __name__ == "__main__":
         help="Commenting style: 'minimal', 'moderate', or 'verbose'."
     )
     parser.add_argument(
-        "--model", type=str, default="llama3.1:8b",
-        help="Ollama model to use (e.g., 'llama3.1:8b', 'mistral', etc.)."
+        "--model", type=str, default="llama3.1:8b-instruct-q4_K_M",
+        help="Ollama model to use (e.g., 'llama3.1:8b-instruct-q4_K_M', 'mistral', etc.)."
     )
 
     args = parser.parse_args()
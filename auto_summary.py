@@ -1,8 +1,11 @@
 
 from pathlib import Path
 from typing import List, Optional
-import ollama
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
+from auto_cache import load_source
+from llm_cache import cached_chat
 
 def find_all_python_files(directory: str, exclude_dirs: Optional[List[str]] = None) -> List[Path]:
     """
@@ -17,23 +20,37 @@ def find_all_python_files(directory: str, exclude_dirs: Optional[List[str]] = No
     """
     # Initialize an empty list to store all Python file paths
     all_py_files = []
-    
+
     # Convert exclude_dirs to a set for faster lookup
-    exclude_dirs = set(exclude_dirs or [])  
-    
-    # Iterate over all files in the directory and its subdirectories with rglob
-    for path in Path(directory).rglob("*.py"):
-        """
-        Check if any part of the path is in the excluded directories
-        
-        We use `any` with a generator expression to check if any part of the path's parts are in exclude_dirs.
-        This ensures we don't include files in excluded directories even if they're not directly inside those dirs.
-        """
-        if not any(part in exclude_dirs for part in path.parts):
-            # If no excluded directory is found, add the file to all_py_files
-            all_py_files.append(path)
-    temp=[x for x in all_py_files ] #if x.name not in ['auto_comment_functions.py','auto_orchestrator.py']]
-    return temp
+    exclude_dirs = set(exclude_dirs or [])
+
+    # Walk the tree top-down, pruning excluded and hidden directories in place so
+    # the walk never descends into them (rglob traversed venv/ and filtered after)
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [d for d in dirs if d not in exclude_dirs and not d.startswith('.')]
+        all_py_files.extend(Path(root) / f for f in files if f.endswith('.py'))
+    return all_py_files
+
+# Plenty for a few preview lines; avoids reading whole files during directory scans
+PREVIEW_READ_BYTES = 4096
+
+def _read_preview(file_path: str, preview_lines: int) -> str:
+    """
+    Reads just the first few lines of a file for a directory-listing preview.
+
+    Only the first PREVIEW_READ_BYTES are read, so large files cost one small
+    read instead of being loaded completely.
+
+    Parameters:
+    - file_path (str): The path of the file to preview.
+    - preview_lines (int): Number of lines to include in the preview.
+
+    Returns:
+    str: The preview text, stripped of surrounding whitespace.
+    """
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+        head = f.read(PREVIEW_READ_BYTES)
+    return '\n'.join(head.splitlines()[:preview_lines]).strip()
 
 def describe_directory_structure(directory: str, output_path: str, exclude_dirs: Optional[List[str]] = None, max_depth=3, show_file_preview=False, preview_lines=3):
     """
@@ -50,52 +67,69 @@ def describe_directory_structure(directory: str, output_path: str, exclude_dirs:
         str: A structured text description of the directory.
     """
     output = []
+    preview_requests = []  # (output slot, file path, indent) resolved after the walk
 
     def walk_dir(current_path, indent_level=0):
         if indent_level > max_depth:
             return
 
-        items = sorted(os.listdir(current_path))
-        for item in items:
-            full_path = os.path.join(current_path, item)
+        # scandir serves is_dir() from the readdir buffer, avoiding a stat per entry
+        with os.scandir(current_path) as it:
+            items = sorted(it, key=lambda entry: entry.name)
+        for entry in items:
+            item = entry.name
             indent = '  ' * indent_level
 
-            if os.path.isdir(full_path):
+            if entry.is_dir(follow_symlinks=False):
                 if (item in exclude_dirs) or (item.startswith('.')):
                     continue
                 output.append(f"{indent}- {item}/")
-                walk_dir(full_path, indent_level + 1)
+                walk_dir(entry.path, indent_level + 1)
 
             else:
                 if item.startswith('.'):
-                    continue    
-                
+                    continue
+
                 output.append(f"{indent}- {item}")
                 if show_file_preview and item.endswith(('.py', '.md', '.txt')):
-                    try:
-                        with open(full_path, 'r', encoding='utf-8') as f:
-                            preview = ''.join(f.readlines()[:preview_lines]).strip()
-                            if preview:
-                                output.append(f"{indent}    Preview:\n{indent}    \"\"\"\n{indent}    {preview}\n{indent}    \"\"\"")
-                    except Exception as e:
-                        output.append(f"{indent}    [Preview Error: {e}]")
+                    # Reserve a slot now; the read happens in the thread pool below
+                    output.append(None)
+                    preview_requests.append((len(output) - 1, entry.path, indent))
+
+    def fetch_preview(request):
+        slot, path, indent = request
+        try:
+            preview = _read_preview(path, preview_lines)
+            if preview:
+                return f"{indent}    Preview:\n{indent}    \"\"\"\n{indent}    {preview}\n{indent}    \"\"\""
+            return None  # Empty files get no preview block, matching the old behavior
+        except Exception as e:
+            return f"{indent}    [Preview Error: {e}]"
 
     output.append(f"# Directory structure for `{os.path.basename(os.path.abspath(directory))}`")
     walk_dir(directory)
-    output='\n'.join(output)
+
+    if preview_requests:
+        # Overlap the open/read/close of every preview file instead of reading them
+        # one at a time; matters most on network filesystems with per-file latency
+        with ThreadPoolExecutor(max_workers=32) as executor:
+            for (slot, _, _), rendered in zip(preview_requests, executor.map(fetch_preview, preview_requests)):
+                output[slot] = rendered
+
+    output='\n'.join(line for line in output if line is not None)
     
     directory_desc_path=Path(output_path) / "README_1_directory_structure.txt"
     with open(directory_desc_path, "w", encoding="utf-8") as f:
         f.write(output)
 
-def summarize_directory(directory: str, exclude_dirs: Optional[List[str]] = None, model: str = "llama3.1:8b"):
+def summarize_directory(directory: str, exclude_dirs: Optional[List[str]] = None, model: str = "llama3.1:8b-instruct-q4_K_M"):
     """
     Summarizes what the directory of code does.
     
     Parameters:
     - directory (str): The path to the root directory to summarize.
     - exclude_dirs (Optional[List[str]], optional): A list of directories to exclude from the summary. Defaults to None.
-    - model (str, optional): The model to use for summarization. Defaults to "llama3.1:8b".
+    - model (str, optional): The model to use for summarization. Defaults to "llama3.1:8b-instruct-q4_K_M".
 
     Returns:
     None
@@ -111,27 +145,32 @@ def summarize_directory(directory: str, exclude_dirs: Optional[List[str]] = None
             
             We use a `try`-`except` block to catch any errors that might occur during this process.
             """
-            with open(py_file, "r", encoding="utf-8") as f:
-                code = f.read()
-            # Construct a prompt for the LLM based on the file's contents
-            prompt = f"""You're a Python code summarizer. Read the file content and briefly describe at a high level what it contains in 1–3 sentences. You wrote this code and are certain about your summary.
+            code = load_source(py_file)  # Cached across passes, so re-reads are free
+            # One prompt asks for both the high-level summary and the process walk-through,
+            # so each file costs a single LLM call instead of two over the same code snippet
+            prompt = f"""You're a Python code summarizer. Read the file content and reply with ONLY a JSON object with two fields:
+    "summary": 1-3 sentences briefly describing at a high level what the file contains, and
+    "processes": 2-4 sentences describing any user defined function calling or other detailed processes, keeping track of the order of function calls.
+    You wrote this code and are certain about your summary.
     {code[:2000]}
-            
-            """
-            response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])
-            # Get the summary from the LLM's response
-            file_summary = response["message"]["content"].strip()
 
-            prompt = f"""You're a Python code summarizer. Read the file content and scan for any user defined function calling or any other detailed processes. Keep track of the order of function calls. Additionally Describe the identified processes in 2–4 sentences. You wrote this code and are certain about your summary.
-    {code[:2000]}
-            
             """
-            response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])
-            # Get the summary from the LLM's response
-            file_processes = response["message"]["content"].strip()
+            # Get the reply from the LLM (served from the disk cache on re-runs)
+            reply = cached_chat(model, [{"role": "user", "content": prompt}]).strip()
+            if reply.startswith("```"):
+                # Strip a Markdown fence the model sometimes wraps the JSON in
+                reply = reply.strip("`").removeprefix("json").strip()
+            try:
+                parsed = json.loads(reply)
+                file_summary = str(parsed.get("summary", "")).strip()
+                file_processes = str(parsed.get("processes", "")).strip()
+            except json.JSONDecodeError:
+                # Unparseable reply: keep the raw text as the summary rather than dropping it
+                file_summary = reply
+                file_processes = "[Could not parse a separate process description]"
 
             # Add the file's summary to the overall summary text
-            summary_txt += f"### {py_file.replace('auto_docu_output/','')}\nfile_summary: {file_summary}\nfile_processes: {file_processes}\n\n"
+            summary_txt += f"### {str(py_file).replace('auto_docu_output/','')}\nfile_summary: {file_summary}\nfile_processes: {file_processes}\n\n"
 
         except Exception as e:
             """
@@ -139,7 +178,7 @@ def summarize_directory(directory: str, exclude_dirs: Optional[List[str]] = None
             
             This ensures that the function doesn't crash if something goes wrong, but still allows the user to see what happened.
             """
-            summary_txt += f"### {py_file.replace('auto_docu_output/','')}\n[Error reading or summarizing file: {e}]\n\n"
+            summary_txt += f"### {str(py_file).replace('auto_docu_output/','')}\n[Error reading or summarizing file: {e}]\n\n"
 
     # Write the summary text to a README file in the root directory
     job_summary_path=Path(directory) / "README_3_job_summaries.txt"
@@ -153,8 +192,7 @@ def summarize_directory(directory: str, exclude_dirs: Optional[List[str]] = None
         prompt = f"""You're a Python code summarizer. Read the file that explains what each python script in the directory contains and briefly describe what the entire directory does holistically, in 2–4 sentences. You wrote this code and are certain about your summary.
 {job_summaries} 
         """
-        response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])
-        directory_summary = response["message"]["content"].strip()
+        directory_summary = cached_chat(model, [{"role": "user", "content": prompt}]).strip()
 
     except Exception as e:
         directory_summary = f"###\n[Error reading or summarizing directory: {e}]\n\n"
@@ -165,7 +203,7 @@ def summarize_directory(directory: str, exclude_dirs: Optional[List[str]] = None
 
     print("Summary written to README_summary.txt")
 
-def generate_readme(txt_dir, output_path, model: str = "llama3.1:8b"):
+def generate_readme(txt_dir, output_path, model: str = "llama3.1:8b-instruct-q4_K_M"):
     """
     Reads .txt files from a directory that describe Python files and uses Ollama to generate a README.md.
     
@@ -208,9 +246,8 @@ The README should include:
 Output ONLY the markdown content of the README.
     """
 
-    # Call Ollama
-    response = ollama.chat(model=model, messages=[{"role": "user", "content": prompt}])
-    result = response["message"]["content"].strip()
+    # Call Ollama (served from the disk cache on re-runs)
+    result = cached_chat(model, [{"role": "user", "content": prompt}]).strip()
 
     # Save the README
     with open(output_path+'/README.md', 'w', encoding='utf-8') as f:
@@ -0,0 +1,132 @@
+import hashlib  # Importing hashlib for hashing prompts into cache keys
+import json     # Importing JSON to serialize messages deterministically
+import ollama   # Importing Ollama for the actual LLM calls on cache misses
+from pathlib import Path
+
+# Directory where cached LLM replies live; one file per (model, prompt) pair
+CACHE_DIR = Path(".autodocu_cache")
+
+# One shared client so every call reuses the same connection pool instead of
+# opening a fresh TCP connection per request
+_CLIENT = ollama.Client()
+
+
+def warm_up(model: str) -> None:
+    """
+    Loads the model into the Ollama server ahead of time and pins it there.
+
+    An empty generate request forces the model load once up front (with a
+    generous keep_alive), so the first real call doesn't pay it and later
+    calls don't risk an eviction/reload.
+
+    Parameters:
+    - model (str): The Ollama model name to preload.
+
+    Returns:
+    None
+    """
+    try:
+        _CLIENT.generate(model=model, prompt="", keep_alive="1h")
+    except Exception as e:
+        # Warming is best-effort; the real calls will surface any hard failure
+        print(f"[Warning: could not warm up model {model}]: {e}")
+
+
+def _cache_key(model: str, messages: list) -> str:
+    """
+    Computes a stable cache key for a chat request.
+
+    Parameters:
+    - model (str): The Ollama model name.
+    - messages (list): The chat messages being sent.
+
+    Returns:
+    str: A hex digest uniquely identifying this model + prompt combination.
+    """
+    # blake2b is faster than sha256 and just as good for cache keying
+    return hashlib.blake2b((model + json.dumps(messages, sort_keys=True)).encode("utf-8")).hexdigest()
+
+
+def cached_chat(model: str, messages: list) -> str:
+    """
+    Calls ollama.chat, caching the reply on disk keyed by model + prompt.
+
+    Re-runs over unchanged source produce identical prompts, so cache hits skip
+    the network call entirely.
+
+    Parameters:
+    - model (str): The Ollama model name.
+    - messages (list): The chat messages to send.
+
+    Returns:
+    str: The content of the LLM's reply.
+    """
+    cache_file = CACHE_DIR / _cache_key(model, messages)
+    if cache_file.is_file():
+        # Cache hit: return the stored reply without touching the network
+        return cache_file.read_text(encoding="utf-8")
+
+    response = _CLIENT.chat(model=model, messages=messages)
+    content = response["message"]["content"]
+
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_file.write_text(content, encoding="utf-8")
+    return content
+
+
+def cached_chat_to_file(model: str, messages: list, file_path) -> None:
+    """
+    Like cached_chat, but streams the reply straight into a file as it is generated.
+
+    Tokens are written to disk as they arrive, overlapping LLM generation with
+    disk I/O instead of buffering the whole response first. The complete reply
+    is still cached once the stream finishes.
+
+    Parameters:
+    - model (str): The Ollama model name.
+    - messages (list): The chat messages to send.
+    - file_path: Destination file for the reply (str or Path).
+
+    Returns:
+    None
+    """
+    cache_file = CACHE_DIR / _cache_key(model, messages)
+    if cache_file.is_file():
+        # Cache hit: copy the stored reply without touching the network
+        Path(file_path).write_text(cache_file.read_text(encoding="utf-8"), encoding="utf-8")
+        return
+
+    parts = []
+    with open(file_path, "w", encoding="utf-8") as out:
+        for chunk in _CLIENT.chat(model=model, messages=messages, stream=True):
+            piece = chunk["message"]["content"]
+            out.write(piece)  # Write each token batch as soon as it arrives
+            parts.append(piece)
+
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_file.write_text("".join(parts), encoding="utf-8")
+
+
+async def cached_chat_async(model: str, messages: list, client) -> str:
+    """
+    Async twin of cached_chat for call sites using ollama.AsyncClient.
+
+    Parameters:
+    - model (str): The Ollama model name.
+    - messages (list): The chat messages to send.
+    - client: An ollama.AsyncClient to use on cache misses.
+
+    Returns:
+    str: The content of the LLM's reply.
+    """
+    cache_file = CACHE_DIR / _cache_key(model, messages)
+    if cache_file.is_file():
+        # Cache hit: return the stored reply without touching the network
+        return cache_file.read_text(encoding="utf-8")
+
+    response = await client.chat(model=model, messages=messages)
+    content = response["message"]["content"]
+
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_file.write_text(content, encoding="utf-8")
+    return content